@@ -1,23 +1,39 @@
 import sys
+import asyncio
 import os
-import re
+import json
+import hashlib
+import functools
+import ipaddress
+import string
+from collections import Counter
 from enum import Enum
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from cachetools import TTLCache
 import logging
 
+# orjson is much faster than stdlib json; fall back if it isn't installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from src.scanner.nmap_engine import NmapScanner
-from src.scanner.scapy_engine import ScapyEngine
-from src.scanner.tshark_engine import TSharkScanner
-from src.ai_agent.gemini_client import GeminiAgent
+from src.scanner.nmap_engine import get_nmap_scanner
+from src.scanner.scapy_engine import get_scapy_engine
+from src.scanner.tshark_engine import get_tshark_scanner
+from src.ai_agent.gemini_client import get_agent
 from src.utils.data_sanitizer import sanitize_scan_data
 from src.utils.token_optimizer import prune_scan_data
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# e.g. LOG_LEVEL=WARNING in production to skip per-scan progress messages
+logging.getLogger().setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
 
 app = FastAPI(title="NetSec AI Kernel")
 
@@ -30,10 +46,15 @@ app.add_middleware(
 )
 
 # Initialize engines
-nmap_engine = NmapScanner()
-scapy_engine = ScapyEngine()
-tshark_engine = TSharkScanner()
-ai_agent = GeminiAgent()
+nmap_engine = get_nmap_scanner()
+scapy_engine = get_scapy_engine()
+tshark_engine = get_tshark_scanner()
+ai_agent = get_agent()
+
+# Generated AI reports keyed by content hash of the analyzed data
+report_cache = TTLCache(maxsize=256, ttl=3600)
+# Gemini calls currently running, keyed the same way as report_cache
+inflight_reports = {}
 
 # --- ENUMS ---
 class ScanMode(str, Enum):
@@ -60,7 +81,7 @@ SCAN_PROFILES = {
             "scapy": 3,
             "tshark": 0,
             "ai": 12,
-            "total": 105
+            "total": 102
         }
     },
     "pen_test": {
@@ -70,20 +91,75 @@ SCAN_PROFILES = {
             "scapy": 5,
             "tshark": 25,
             "ai": 15,
-            "total": 225
+            "total": 195
         }
     }
 }
 
+# TShark capture length for pen_test scans (seconds)
+TSHARK_PEN_TEST_DURATION = SCAN_PROFILES["pen_test"]["estimated_seconds"]["tshark"]
+
 # --- SECURITY: INPUT VALIDATION ---
-def validate_target(target: str):
-    # Stricter IPv4 regex that validates octet range (0-255)
-    ipv4_regex = r"^(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$"
-    domain_regex = r"^(?:[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}$"
+MAX_TARGET_LENGTH = 253
+
+_REJECT_CHARS = frozenset(" \t\r\n/\\;|&$`'\"<>")
+_DOMAIN_EDGE_CHARS = frozenset(string.ascii_letters + string.digits)
+_DOMAIN_LABEL_CHARS = _DOMAIN_EDGE_CHARS | {"-"}
+
+def _is_valid_domain(target: str) -> bool:
+    """
+    Label-by-label hostname check (no regex, so no backtracking on hostile input).
+    - Every label: 1-63 chars, alphanumeric or '-', no leading/trailing '-'
+    - Final label (TLD): letters only, at least 2 chars
+    """
+    if len(target) > MAX_TARGET_LENGTH or not target.isascii():
+        return False
+    
+    labels = target.split('.')
+    if len(labels) < 2:
+        return False
+    
+    tld = labels[-1]
+    if len(tld) < 2 or not tld.isalpha():
+        return False
     
-    if re.match(ipv4_regex, target) or re.match(domain_regex, target) or target == "localhost":
-        return True
-    raise ValueError("Invalid Target Format. Detection of potential injection attack.")
+    for label in labels[:-1]:
+        if not 1 <= len(label) <= 63:
+            return False
+        if label[0] not in _DOMAIN_EDGE_CHARS or label[-1] not in _DOMAIN_EDGE_CHARS:
+            return False
+        # Set comparison runs in C instead of a per-character Python loop
+        if not _DOMAIN_LABEL_CHARS.issuperset(label):
+            return False
+    return True
+
+@functools.lru_cache(maxsize=1024)
+def _is_valid_target(target: str) -> bool:
+    """
+    Cached target check; dashboards re-scan the same targets repeatedly.
+    Callers must apply the length gate first so the cache only holds bounded strings.
+    """
+    # Obvious injection attempts (whitespace, shell metacharacters) never reach the parsers
+    if not _REJECT_CHARS.isdisjoint(target):
+        return False
+    
+    # IPv4 fast path: the C-level parser checks octet ranges without regex backtracking.
+    # Only attempted when the target starts with a digit; hostnames such as
+    # "1password.com" still fall through to the domain check.
+    if target[0].isdigit():
+        try:
+            ipaddress.IPv4Address(target)
+            return True
+        except ValueError:
+            pass
+    
+    return _is_valid_domain(target) or target == "localhost"
+
+def validate_target(target: str):
+    # Bound worst-case work: 253 is the DNS FQDN maximum
+    if not target or len(target) > MAX_TARGET_LENGTH or not _is_valid_target(target):
+        raise ValueError("Invalid Target Format. Detection of potential injection attack.")
+    return True
 
 class ScanRequest(BaseModel):
     target: str
@@ -91,11 +167,83 @@ class ScanRequest(BaseModel):
 
 # --- FIREWALL ANALYSIS HELPERS ---
 
+# Nmap inference rules, evaluated in order; the first matching predicate wins.
+# Each record: (predicate(filtered, open, closed, total), response_type,
+#               firewall_status, explanation template, confidence)
+# "All Open" is the most common outcome on real scans, so it is tested first.
+# Every other rule requires a filtered port, so with f == 0 it was already the
+# first reachable rule and moving it ahead doesn't change any classification.
+FIREWALL_INFERENCE_RULES = (
+    # Rule 1: All or mostly open, nothing filtered = Permissive Firewall
+    (
+        lambda f, o, c, t: f == 0 and o >= t - 1,
+        "All Open",
+        "Permissive / Unfiltered (Inferred via Nmap)",
+        "Nmap detected {open}/{total} ports as open with minimal filtering. Firewall is permissive or absent.",
+        "high"
+    ),
+    # Rule 2: High percentage of filtered ports = Stateful Firewall
+    (
+        lambda f, o, c, t: f > 0 and f / t >= 0.5,
+        "Mixed (Filtered Majority)",
+        "Stateful / Filtered (Inferred via Nmap)",
+        "Nmap detected {filtered}/{total} ports as filtered. This indicates a stateful firewall is active, blocking unsolicited packets.",
+        "high"
+    ),
+    # Rule 3: Mostly open ports with some filtered = Complex Rules
+    (
+        lambda f, o, c, t: o > 0 and f > 0,
+        "Mixed (Open + Filtered)",
+        "Stateful with Selective Rules (Inferred via Nmap)",
+        "Nmap detected {open} open and {filtered} filtered ports. The firewall has selective rules allowing some services.",
+        "medium"
+    ),
+    # Rule 4: Mix of closed and filtered = Moderate Security
+    (
+        lambda f, o, c, t: c > 0 and f > 0,
+        "Mixed (Closed + Filtered)",
+        "Moderate Firewall (Stateless Likely)",
+        "Nmap detected closed and filtered ports. Firewall likely responds differently to various probes.",
+        "medium"
+    ),
+    # Rule 5: Mostly closed ports = Stateless/Unfiltered
+    (
+        lambda f, o, c, t: c >= t - 1,
+        "Mostly Closed",
+        "Stateless / Unfiltered (Inferred via Nmap)",
+        "Most ports are closed (host responds), suggesting a stateless firewall or host-level filtering.",
+        "medium"
+    ),
+)
+
+# Default when no rule matches
+FIREWALL_INFERENCE_DEFAULT = (
+    "Indeterminate",
+    "Unknown Firewall State (Inferred via Nmap)",
+    "Nmap detected mixed port states. Firewall configuration is complex or indeterminate.",
+    "low"
+)
+
+def _nmap_inference_result(target, response_type, firewall_status, explanation, confidence, port="N/A", port_breakdown=None) -> dict:
+    """Builds a firewall analysis dict in the shape shared by every Nmap inference outcome."""
+    result = {
+        "target": target,
+        "port": port,
+        "response_type": response_type,
+        "firewall_status": firewall_status,
+        "explanation": explanation,
+        "inference_method": "nmap_fallback",
+        "confidence": confidence
+    }
+    if port_breakdown is not None:
+        result["port_breakdown"] = port_breakdown
+    return result
+
 def infer_firewall_from_nmap(scan_data: dict, target: str) -> dict:
     """
     Fallback firewall detection using Nmap port state analysis.
     
-    Logic:
+    Logic (see FIREWALL_INFERENCE_RULES):
     - If ANY port is 'filtered' -> Stateful firewall detected
     - If ports are 'closed' but host is up -> Likely unfiltered/stateless
     - If ALL ports are 'open' -> Very permissive firewall
@@ -111,158 +259,88 @@ def infer_firewall_from_nmap(scan_data: dict, target: str) -> dict:
     try:
         hosts = scan_data.get("hosts", [])
         if not hosts:
-            return {
-                "target": target,
-                "port": "N/A",
-                "response_type": "No Host Data",
-                "firewall_status": "Unknown",
-                "explanation": "No host data available from Nmap scan.",
-                "inference_method": "nmap_fallback",
-                "confidence": "low"
-            }
+            return _nmap_inference_result(
+                target, "No Host Data", "Unknown",
+                "No host data available from Nmap scan.", "low"
+            )
         
         host_data = hosts[0]
         open_ports = host_data.get("open_ports", [])
         
         if not open_ports:
-            return {
-                "target": target,
-                "port": "N/A",
-                "response_type": "No Open Ports",
-                "firewall_status": "Highly Restrictive / Firewall Active",
-                "explanation": "No open ports detected. Target is either offline or protected by an aggressive firewall.",
-                "inference_method": "nmap_fallback",
-                "confidence": "high"
-            }
+            return _nmap_inference_result(
+                target, "No Open Ports", "Highly Restrictive / Firewall Active",
+                "No open ports detected. Target is either offline or protected by an aggressive firewall.", "high"
+            )
         
         # Analyze port states
-        port_states = {}
-        for port in open_ports:
-            state = port.get("state", "unknown") if isinstance(port, dict) else "unknown"
-            port_states[state] = port_states.get(state, 0) + 1
+        port_states = Counter(
+            port.get("state", "unknown") if isinstance(port, dict) else "unknown"
+            for port in open_ports
+        )
         
         total_ports = len(open_ports)
-        if total_ports == 0:
-            # Safety check - shouldn't reach here due to earlier check, but just in case
-            return {
-                "target": target,
-                "port": "N/A",
-                "response_type": "No Data",
-                "firewall_status": "Unable to Determine",
-                "explanation": "No port data available for analysis.",
-                "inference_method": "nmap_fallback",
-                "confidence": "low"
-            }
-        
-        filtered_count = port_states.get("filtered", 0)
-        open_count = port_states.get("open", 0)
-        closed_count = port_states.get("closed", 0)
+        filtered_count = port_states["filtered"]
+        open_count = port_states["open"]
+        closed_count = port_states["closed"]
         
-        logging.info(f"[Firewall Inference] Port states: {port_states}")
+        logging.info("[Firewall Inference] Port states: %s", port_states)
         
         # --- INFERENCE RULES ---
+        for predicate, response_type, firewall_status, explanation, confidence in FIREWALL_INFERENCE_RULES:
+            if predicate(filtered_count, open_count, closed_count, total_ports):
+                break
+        else:
+            response_type, firewall_status, explanation, confidence = FIREWALL_INFERENCE_DEFAULT
         
-        # Rule 1: High percentage of filtered ports = Stateful Firewall
-        if filtered_count > 0 and (filtered_count / len(open_ports)) >= 0.5:
-            return {
-                "target": target,
-                "port": "multiple",
-                "response_type": "Mixed (Filtered Majority)",
-                "firewall_status": "Stateful / Filtered (Inferred via Nmap)",
-                "explanation": f"Nmap detected {filtered_count}/{len(open_ports)} ports as filtered. This indicates a stateful firewall is active, blocking unsolicited packets.",
-                "inference_method": "nmap_fallback",
-                "confidence": "high",
-                "port_breakdown": port_states
-            }
-        
-        # Rule 2: Mostly open ports with some filtered = Complex Rules
-        if open_count > 0 and filtered_count > 0:
-            return {
-                "target": target,
-                "port": "multiple",
-                "response_type": "Mixed (Open + Filtered)",
-                "firewall_status": "Stateful with Selective Rules (Inferred via Nmap)",
-                "explanation": f"Nmap detected {open_count} open and {filtered_count} filtered ports. The firewall has selective rules allowing some services.",
-                "inference_method": "nmap_fallback",
-                "confidence": "medium",
-                "port_breakdown": port_states
-            }
-        
-        # Rule 3: All or mostly open = Permissive Firewall
-        if open_count >= (len(open_ports) - 1):
-            return {
-                "target": target,
-                "port": "multiple",
-                "response_type": "All Open",
-                "firewall_status": "Permissive / Unfiltered (Inferred via Nmap)",
-                "explanation": f"Nmap detected {open_count}/{len(open_ports)} ports as open with minimal filtering. Firewall is permissive or absent.",
-                "inference_method": "nmap_fallback",
-                "confidence": "high",
-                "port_breakdown": port_states
-            }
-        
-        # Rule 4: Mix of closed and filtered = Moderate Security
-        if closed_count > 0 and filtered_count > 0:
-            return {
-                "target": target,
-                "port": "multiple",
-                "response_type": "Mixed (Closed + Filtered)",
-                "firewall_status": "Moderate Firewall (Stateless Likely)",
-                "explanation": f"Nmap detected closed and filtered ports. Firewall likely responds differently to various probes.",
-                "inference_method": "nmap_fallback",
-                "confidence": "medium",
-                "port_breakdown": port_states
-            }
-        
-        # Rule 5: Mostly closed ports = Stateless/Unfiltered
-        if closed_count >= (len(open_ports) - 1):
-            return {
-                "target": target,
-                "port": "multiple",
-                "response_type": "Mostly Closed",
-                "firewall_status": "Stateless / Unfiltered (Inferred via Nmap)",
-                "explanation": "Most ports are closed (host responds), suggesting a stateless firewall or host-level filtering.",
-                "inference_method": "nmap_fallback",
-                "confidence": "medium",
-                "port_breakdown": port_states
-            }
-        
-        # Default fallback
-        return {
-            "target": target,
-            "port": "multiple",
-            "response_type": "Indeterminate",
-            "firewall_status": "Unknown Firewall State (Inferred via Nmap)",
-            "explanation": "Nmap detected mixed port states. Firewall configuration is complex or indeterminate.",
-            "inference_method": "nmap_fallback",
-            "confidence": "low",
-            "port_breakdown": port_states
-        }
+        # The raw breakdown is only worth carrying through sanitization (and into the
+        # AI prompt) when the classification itself is uncertain
+        return _nmap_inference_result(
+            target, response_type, firewall_status,
+            explanation.format(filtered=filtered_count, open=open_count, closed=closed_count, total=total_ports),
+            confidence, port="multiple",
+            port_breakdown=dict(port_states) if confidence == "low" else None
+        )
     
     except Exception as e:
-        logging.error(f"Nmap firewall inference failed: {e}")
-        return {
-            "target": target,
-            "port": "N/A",
-            "response_type": "Inference Error",
-            "firewall_status": "Unable to Determine",
-            "explanation": f"Firewall inference failed: {str(e)}",
-            "inference_method": "nmap_fallback",
-            "confidence": "low"
-        }
+        logging.error("Nmap firewall inference failed: %s", e)
+        return _nmap_inference_result(
+            target, "Inference Error", "Unable to Determine",
+            f"Firewall inference failed: {str(e)}", "low"
+        )
 
-def analyze_firewall(scan_data: dict, target: str, scan_mode: str) -> dict:
+def probe_firewall(target: str, scan_mode: str) -> dict:
+    """
+    Scapy direct ACK probe (requires admin/root).
+    
+    Uses a fixed port per mode and does not depend on Nmap results,
+    so it can run concurrently with the Nmap stage.
+    
+    Returns:
+        Scapy result dict, or dict with 'error' key on failure
+    """
+    logging.info("[Firewall Analysis] Attempting Scapy probe on %s...", target)
+    
+    try:
+        # Determine target port based on scan mode
+        firewall_port = 445 if scan_mode == "pen_test" else 80
+        return scapy_engine.firewall_detect(target, port=firewall_port)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+def analyze_firewall(scan_data: dict, target: str, scan_mode: str, fw_status: dict) -> dict:
     """
     Primary firewall analysis with graceful fallback.
     
     Strategy:
-    1. Try Scapy direct probe (requires admin/root)
-    2. Fall back to Nmap inference if Scapy fails
+    1. Use the Scapy direct probe result (see probe_firewall)
+    2. Fall back to Nmap inference if Scapy failed
     
     Args:
         scan_data: Raw Nmap result
         target: Target IP
-        scan_mode: Scan mode (determines whether to attempt Scapy)
+        scan_mode: Scan mode (determines whether firewall analysis applies)
+        fw_status: Result of probe_firewall for this target
     
     Returns:
         dict with firewall analysis (from Scapy or Nmap inference)
@@ -274,36 +352,28 @@ def analyze_firewall(scan_data: dict, target: str, scan_mode: str) -> dict:
             "reason": f"Firewall analysis not enabled for {scan_mode} mode"
         }
     
-    logging.info(f"[Firewall Analysis] Attempting Scapy probe on {target}...")
-    
-    try:
-        # Determine target port based on scan mode
-        firewall_port = 445 if scan_mode == "pen_test" else 80
-        
-        # Attempt direct probe with Scapy
-        fw_status = scapy_engine.firewall_detect(target, port=firewall_port)
-        
-        # Check if Scapy encountered an error
-        if "error" in fw_status:
-            raise PermissionError(fw_status["error"])
-        
-        logging.info(f"[Firewall Analysis] Scapy probe successful: {fw_status['firewall_status']}")
-        fw_status["inference_method"] = "scapy_direct"
-        return fw_status
-    
-    except PermissionError as pe:
-        logging.warning(f"[Firewall Analysis] Scapy requires elevated privileges: {pe}")
-        logging.info(f"[Firewall Analysis] Falling back to Nmap-based inference...")
+    # Check if Scapy encountered an error
+    if "error" in fw_status:
+        logging.warning("[Firewall Analysis] Scapy probe failed (elevated privileges required?): %s", fw_status['error'])
+        logging.info("[Firewall Analysis] Falling back to Nmap-based inference...")
         
         # Use Nmap inference as fallback
         return infer_firewall_from_nmap(scan_data, target)
     
+    logging.info("[Firewall Analysis] Scapy probe successful: %s", fw_status['firewall_status'])
+    fw_status["inference_method"] = "scapy_direct"
+    return fw_status
+
+def run_tshark_capture(target: str, duration: int) -> dict:
+    """TShark capture wrapper that never raises (runs inside an executor)."""
+    try:
+        logging.info("[*] Initiating TShark packet capture...")
+        capture_result = tshark_engine.run_capture(target, duration=duration)
+        logging.info("[✓] TShark capture complete")
+        return capture_result
     except Exception as e:
-        logging.warning(f"[Firewall Analysis] Scapy probe failed ({type(e).__name__}): {e}")
-        logging.info(f"[Firewall Analysis] Falling back to Nmap-based inference...")
-        
-        # Use Nmap inference as fallback
-        return infer_firewall_from_nmap(scan_data, target)
+        logging.warning("[!] TShark capture failed: %s", e)
+        return {"error": str(e), "status": "failed"}
 
 @app.post("/api/scan")
 async def run_scan(request: ScanRequest):
@@ -316,47 +386,55 @@ async def run_scan(request: ScanRequest):
         validate_target(request.target)
         scan_mode = request.scan_mode.value
         
-        logging.info(f"[*] Initiating {scan_mode.upper()} scan on {request.target}...")
+        logging.info("[*] Initiating %s scan on %s...", scan_mode.upper(), request.target)
+        
+        # 2. LAUNCH STAGES CONCURRENTLY
+        # Nmap, the Scapy probe (deep & pen_test) and the TShark capture (pen_test)
+        # are independent blocking calls, so wall-clock is the slowest stage, not the sum.
+        # Each runs in a worker thread so the event loop stays free for other requests.
+        nmap_future = asyncio.create_task(asyncio.to_thread(nmap_engine.run_scan, request.target, mode=scan_mode))
         
-        # 2. NMAP SCAN (all modes)
-        scan_result = nmap_engine.run_scan(request.target, mode=scan_mode)
+        side_futures = {}
+        if scan_mode in ["deep", "pen_test"]:
+            side_futures["firewall"] = asyncio.create_task(asyncio.to_thread(probe_firewall, request.target, scan_mode))
+        if scan_mode == "pen_test":
+            side_futures["tshark"] = asyncio.create_task(asyncio.to_thread(run_tshark_capture, request.target, TSHARK_PEN_TEST_DURATION))
+        
+        # 3. NMAP RESULT (all modes) - awaited first so errors exit early
+        scan_result = await nmap_future
         
         if "error" in scan_result:
+            for future in side_futures.values():
+                future.cancel()
             raise HTTPException(status_code=500, detail=scan_result["error"])
         
-        # 3. FIREWALL ANALYSIS (deep & pen_test only) with Intelligent Fallback
-        if scan_mode in ["deep", "pen_test"]:
-            logging.info(f"[*] Initiating firewall analysis for {scan_mode} mode...")
-            fw_analysis = analyze_firewall(scan_result, request.target, scan_mode)
+        side_results = dict(zip(side_futures, await asyncio.gather(*side_futures.values())))
+        
+        # 4. FIREWALL ANALYSIS (deep & pen_test only) with Intelligent Fallback
+        if "firewall" in side_results:
+            logging.info("[*] Initiating firewall analysis for %s mode...", scan_mode)
+            fw_analysis = analyze_firewall(scan_result, request.target, scan_mode, side_results["firewall"])
             scan_result["firewall_analysis"] = fw_analysis
             
             # Log the method used
             method = fw_analysis.get("inference_method", "unknown")
-            logging.info(f"[✓] Firewall analysis complete (method: {method})")
+            logging.info("[✓] Firewall analysis complete (method: %s)", method)
         
-        # 4. TSHARK PACKET CAPTURE (pen_test only)
-        if scan_mode == "pen_test":
-            try:
-                logging.info(f"[*] Initiating TShark packet capture...")
-                tshark_duration = SCAN_PROFILES["pen_test"]["estimated_seconds"]["tshark"]
-                capture_result = tshark_engine.run_capture(request.target, duration=tshark_duration)
-                scan_result["tshark_capture"] = capture_result
-                logging.info(f"[✓] TShark capture complete")
-            except Exception as e:
-                logging.warning(f"[!] TShark capture failed: {e}")
-                scan_result["tshark_capture"] = {"error": str(e), "status": "failed"}
+        # 5. TSHARK PACKET CAPTURE (pen_test only)
+        if "tshark" in side_results:
+            scan_result["tshark_capture"] = side_results["tshark"]
         
-        # 5. DATA SANITIZATION (PRIVACY-BY-DESIGN)
-        logging.info(f"[*] Sanitizing scan data...")
-        clean_data = sanitize_scan_data(scan_result, target=request.target)
-        logging.info(f"[✓] Data sanitization complete")
+        # 6. DATA SANITIZATION (PRIVACY-BY-DESIGN)
+        logging.info("[*] Sanitizing scan data...")
+        clean_data = await asyncio.to_thread(sanitize_scan_data, scan_result, target=request.target)
+        logging.info("[✓] Data sanitization complete")
         
-        # 6. TOKEN OPTIMIZATION
-        logging.info(f"[*] Optimizing data for AI analysis...")
-        optimized_data = prune_scan_data(clean_data)
-        logging.info(f"[✓] Optimization complete")
+        # 7. TOKEN OPTIMIZATION
+        logging.info("[*] Optimizing data for AI analysis...")
+        optimized_data = await asyncio.to_thread(prune_scan_data, clean_data)
+        logging.info("[✓] Optimization complete")
         
-        logging.info(f"[✓] Scan pipeline complete for {request.target}")
+        logging.info("[✓] Scan pipeline complete for %s", request.target)
         
         return {
             "status": "scan_complete",
@@ -365,24 +443,72 @@ async def run_scan(request: ScanRequest):
         }
         
     except ValueError as ve:
-        logging.error(f"[!] Validation error: {ve}")
+        logging.error("[!] Validation error: %s", ve)
         raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
-        logging.error(f"[!] Scan error: {e}")
+        logging.error("[!] Scan error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+def report_cache_key(optimized_data: dict) -> bytes:
+    """Content hash of the pruned scan data (key order independent)."""
+    if orjson is not None:
+        payload = orjson.dumps(optimized_data, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    else:
+        payload = json.dumps(optimized_data, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+async def generate_report(cache_key: bytes, optimized_data: dict) -> str:
+    """Runs one Gemini analysis and caches the report unless it failed."""
+    report = await ai_agent.analyze_scan(optimized_data)
+    if not report.startswith("Error during analysis"):
+        report_cache[cache_key] = report
+    return report
+
 @app.post("/api/analyze")
 async def analyze_scan(data: dict):
     """AI threat analysis endpoint."""
     try:
-        logging.info(f"[*] Received analysis request...")
-        optimized_data = prune_scan_data(data)
-        logging.info(f"[*] Sending optimized data to Gemini...")
-        report = ai_agent.analyze_scan(optimized_data)
-        logging.info(f"[✓] AI analysis complete")
+        logging.info("[*] Received analysis request...")
+        optimized_data = await asyncio.to_thread(prune_scan_data, data)
+        
+        # Identical scan data (UI retries, tab switches) reuses the previous report
+        cache_key = report_cache_key(optimized_data)
+        report = report_cache.get(cache_key)
+        if report is not None:
+            logging.info("[✓] AI analysis served from cache")
+            return {"report": report}
+        
+        # Concurrent requests for the same data share a single Gemini call
+        pending = inflight_reports.get(cache_key)
+        if pending is None:
+            logging.info("[*] Sending optimized data to Gemini...")
+            pending = asyncio.ensure_future(generate_report(cache_key, optimized_data))
+            inflight_reports[cache_key] = pending
+            pending.add_done_callback(lambda _: inflight_reports.pop(cache_key, None))
+        else:
+            logging.info("[*] Joining in-flight Gemini analysis for identical data...")
+        
+        # Shielded so one client disconnecting doesn't cancel the call for the others
+        report = await asyncio.shield(pending)
+        logging.info("[✓] AI analysis complete")
         return {"report": report}
     except Exception as e:
-        logging.error(f"[!] Analysis error: {e}")
+        logging.error("[!] Analysis error: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/analyze/stream")
+async def analyze_scan_stream(data: dict):
+    """AI threat analysis endpoint, streaming the report as it is generated."""
+    try:
+        logging.info("[*] Received streaming analysis request...")
+        optimized_data = await asyncio.to_thread(prune_scan_data, data)
+        logging.info("[*] Streaming optimized data to Gemini...")
+        return StreamingResponse(
+            ai_agent.analyze_scan_stream(optimized_data),
+            media_type="text/plain; charset=utf-8"
+        )
+    except Exception as e:
+        logging.error("[!] Analysis error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/health")
@@ -396,5 +522,10 @@ async def health_check():
 
 if __name__ == "__main__":
     import uvicorn
-    logging.info("[*] Starting NetSec AI Kernel on http://127.0.0.1:8000")
-    uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
+    # Multiple workers need the app as an import string (each worker imports it)
+    workers = int(os.getenv("UVICORN_WORKERS", "1"))
+    logging.info("[*] Starting NetSec AI Kernel on http://127.0.0.1:8000 (%s worker(s))", workers)
+    if workers > 1:
+        uvicorn.run("server:app", host="127.0.0.1", port=8000, workers=workers)
+    else:
+        uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
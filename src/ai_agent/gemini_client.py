@@ -3,10 +3,18 @@
 
 import os
 import json
+import asyncio
 import logging
+import functools
 import google.generativeai as genai
 from dotenv import load_dotenv
 
+# orjson is much faster than stdlib json; fall back if it isn't installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Try relative import, fallback to absolute for testing
 try:
     from .prompts import SYSTEM_PROMPT
@@ -16,6 +24,24 @@ except ImportError:
 load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Last model that initialized successfully, tried first on the next startup
+MODEL_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".netsec", "model_cache.json")
+
+def _load_cached_model_name():
+    try:
+        with open(MODEL_CACHE_PATH, "r") as f:
+            return json.load(f).get("model_name")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def _save_cached_model_name(model_name):
+    try:
+        os.makedirs(os.path.dirname(MODEL_CACHE_PATH), exist_ok=True)
+        with open(MODEL_CACHE_PATH, "w") as f:
+            json.dump({"model_name": model_name}, f)
+    except OSError as e:
+        logging.warning(f"Could not write model cache: {e}")
+
 class GeminiAgent:
     def __init__(self):
         self.api_key = os.getenv("GOOGLE_API_KEY")
@@ -23,7 +49,10 @@ class GeminiAgent:
             logging.error("GOOGLE_API_KEY not found in .env file.")
             raise ValueError("Missing API Key")
 
-        genai.configure(api_key=self.api_key)
+        # gRPC transport keeps one long-lived channel per process (the SDK caches
+        # its default clients), so every request after the first skips the TLS handshake.
+        # Configure once here; re-running configure() would drop the cached clients.
+        genai.configure(api_key=self.api_key, transport="grpc")
         
         # UPDATED MODEL LIST based on your check_models.py output
         # We prioritize 2.5 Flash for speed/quality, then fall back to 2.0
@@ -40,8 +69,15 @@ class GeminiAgent:
     def _initialize_model(self):
         """
         Iterates through preferred models and initializes the first one that works.
+        The last known-good model (from MODEL_CACHE_PATH) is tried first.
         """
-        for model_name in self.preferred_models:
+        candidates = list(self.preferred_models)
+        cached_name = _load_cached_model_name()
+        if cached_name in candidates:
+            candidates.remove(cached_name)
+            candidates.insert(0, cached_name)
+
+        for model_name in candidates:
             try:
                 logging.info(f"Attempting to initialize model: {model_name}")
                 self.model = genai.GenerativeModel(
@@ -50,6 +86,8 @@ class GeminiAgent:
                 )
                 self.current_model_name = model_name
                 logging.info(f"Selected Model: {model_name}")
+                if model_name != cached_name:
+                    _save_cached_model_name(model_name)
                 return
             except Exception as e:
                 logging.warning(f"Failed to init {model_name}: {e}")
@@ -62,24 +100,55 @@ class GeminiAgent:
         except:
             raise RuntimeError("Could not initialize any Gemini models. Check API Key.")
 
-    def analyze_scan(self, scan_data):
-        try:
-            if isinstance(scan_data, dict):
-                scan_json_str = json.dumps(scan_data, indent=2)
+    def _build_prompt(self, scan_data):
+        if isinstance(scan_data, dict):
+            # Compact JSON: the model doesn't need pretty-printing, and whitespace costs input tokens
+            if orjson is not None:
+                scan_json_str = orjson.dumps(scan_data, option=orjson.OPT_NON_STR_KEYS).decode()
             else:
-                scan_json_str = scan_data
+                scan_json_str = json.dumps(scan_data, separators=(",", ":"))
+        else:
+            scan_json_str = scan_data
+        return f"Here is the Nmap scan result: \n\n{scan_json_str}"
+
+    async def analyze_scan(self, scan_data):
+        try:
+            prompt = self._build_prompt(scan_data)
 
             logging.info(f"Sending data to {self.current_model_name}...")
             
-            response = self.model.generate_content(
-                f"Here is the Nmap scan result: \n\n{scan_json_str}"
-            )
+            # Native async call: no executor thread is held while waiting on Gemini
+            response = await self.model.generate_content_async(prompt)
             return response.text
 
         except Exception as e:
             logging.error(f"AI Analysis Failed: {e}")
             return f"Error during analysis: {str(e)}"
 
+    def analyze_scan_stream(self, scan_data):
+        """
+        Streaming variant of analyze_scan.
+        Yields report text chunks as Gemini produces them.
+        """
+        try:
+            prompt = self._build_prompt(scan_data)
+
+            logging.info(f"Streaming data to {self.current_model_name}...")
+            
+            response = self.model.generate_content(prompt, stream=True)
+            for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+
+        except Exception as e:
+            logging.error(f"AI Analysis Failed: {e}")
+            yield f"Error during analysis: {str(e)}"
+
+@functools.lru_cache(maxsize=1)
+def get_agent():
+    """Process-wide GeminiAgent, so repeated imports don't re-run model initialization."""
+    return GeminiAgent()
+
 if __name__ == "__main__":
     # Test Block
     mock_scan_file = "logs/temp_scans/latest_scan.json"
@@ -88,6 +157,6 @@ if __name__ == "__main__":
             scan_data = json.load(f)
         
         agent = GeminiAgent()
-        print(agent.analyze_scan(scan_data))
+        print(asyncio.run(agent.analyze_scan(scan_data)))
     else:
         print("Run nmap_engine.py first to generate data.")
\ No newline at end of file
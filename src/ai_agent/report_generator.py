@@ -1,41 +1,65 @@
 # Logic to format AI output
 import os
+import json
 import logging
 from datetime import datetime
 
+def _json_preview(data, limit):
+    """
+    First `limit` characters of the indented JSON for `data`.
+    Encodes incrementally and stops once enough text is produced,
+    so large scans don't pay for serializing data that gets truncated anyway.
+    """
+    encoder = json.JSONEncoder(indent=2)
+    chunks = []
+    total = 0
+    for chunk in encoder.iterencode(data):
+        chunks.append(chunk)
+        total += len(chunk)
+        if total >= limit:
+            break
+    return "".join(chunks)[:limit]
+
 class ReportGenerator:
     def __init__(self):
         self.reports_dir = os.path.join(os.getcwd(), "logs", "reports")
-        if not os.path.exists(self.reports_dir):
-            os.makedirs(self.reports_dir)
+        os.makedirs(self.reports_dir, exist_ok=True)
             
     def save_report(self, ai_text, target_ip, scan_data=None):
         """
         Saves the AI analysis to a Markdown file.
         """
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        # Single clock read so the filename and the header date always agree
+        now = datetime.now()
+        timestamp = now.strftime("%Y-%m-%d_%H-%M-%S")
         filename = f"Report_{target_ip}_{timestamp}.md"
         filepath = os.path.join(self.reports_dir, filename)
         
+        # Assemble the whole report up front: one encode and one write call
+        parts = [
+            # Add a header with metadata
+            "# Security Assessment Report\n",
+            f"**Target:** {target_ip}\n",
+            f"**Date:** {now.strftime('%Y-%m-%d %H:%M:%S')}\n",
+            "---\n\n",
+            # The AI Content
+            ai_text
+        ]
+        
         try:
-            with open(filepath, "w", encoding="utf-8") as f:
-                # Add a header with metadata
-                f.write(f"# Security Assessment Report\n")
-                f.write(f"**Target:** {target_ip}\n")
-                f.write(f"**Date:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write("---\n\n")
-                
-                # Write the AI Content
-                f.write(ai_text)
-                
-                # Optional: Append raw technical data at the end
-                if scan_data:
-                    f.write("\n\n---\n## Appendix: Raw Technical Data\n")
-                    f.write("```json\n")
-                    # Convert dict to string if needed, limited to first 2000 chars to save space
-                    import json
-                    f.write(json.dumps(scan_data, indent=2)[:2000] + "\n... (truncated)")
-                    f.write("\n```")
+            # Optional: Append raw technical data at the end
+            if scan_data:
+                parts.append("\n\n---\n## Appendix: Raw Technical Data\n")
+                parts.append("```json\n")
+                # Limited to first 2000 chars to save space
+                parts.append(_json_preview(scan_data, 2000) + "\n... (truncated)")
+                parts.append("\n```")
+            
+            report_bytes = "".join(parts).encode("utf-8")
+            
+            # Binary mode skips the text I/O layer; a single large write bypasses buffering
+            with open(filepath, "wb") as f:
+                f.write(report_bytes)
 
             logging.info(f"Report saved locally to {filepath}")
             return filepath
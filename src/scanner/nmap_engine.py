@@ -1,36 +1,44 @@
-import nmap
 import logging
 import socket
+import functools
+import operator
 import shutil
-import os
+import subprocess
+import tempfile
+import types
+import xml.etree.ElementTree as ET
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# (protocol, port) sort key evaluated in C rather than a Python lambda
+_PORT_SORT_KEY = operator.itemgetter("protocol", "port")
+
+@functools.lru_cache(maxsize=1)
+def _find_nmap():
+    """Locates the Nmap binary once per process."""
+    # Streamlit Cloud installs it to /usr/bin/nmap usually
+    possible_paths = ["/usr/bin/nmap", "/usr/local/bin/nmap", "nmap"]
+    
+    for path in possible_paths:
+        if shutil.which(path):
+            return path
+    return None
+
+@functools.lru_cache(maxsize=128)
+def _resolve(target):
+    """Cached DNS lookup; failures raise and are not cached."""
+    return socket.gethostbyname(target)
+
 class NmapScanner:
     def __init__(self):
         # 1. Force Python to find the Nmap binary
-        # Streamlit Cloud installs it to /usr/bin/nmap usually
-        possible_paths = ["/usr/bin/nmap", "/usr/local/bin/nmap", "nmap"]
-        
-        found_path = None
-        for path in possible_paths:
-            if shutil.which(path):
-                found_path = path
-                break
+        found_path = _find_nmap()
         
         if not found_path:
-            # Last ditch effort: Assume it's in path even if shutil misses it
-            found_path = "nmap"
-
-        try:
-            # Initialize with specific path if found
-            self.scanner = nmap.PortScanner(nmap_search_path=[found_path])
-            logging.info(f"Nmap Scanner initialized at: {found_path}")
-        except nmap.PortScannerError:
             raise Exception("Nmap binary not found. Did you add 'packages.txt' and REBOOT?")
-        except Exception as e:
-            logging.error(f"Error initializing scanner: {e}")
-            raise
+
+        self.nmap_path = found_path
+        logging.info(f"Nmap Scanner initialized at: {found_path}")
 
     def run_scan(self, target, mode="fast", fast_mode=None):
         """
@@ -46,83 +54,246 @@ class NmapScanner:
         """
         try:
             # Resolve target first to ensure validity
-            socket.gethostbyname(target)
+            _resolve(target)
             
             # Support legacy fast_mode parameter
             if fast_mode is not None:
                 mode = "fast" if fast_mode else "deep"
             
-            logging.info(f"Starting {mode} scan on target: {target}...")
+            logging.info("Starting %s scan on target: %s...", mode, target)
 
-            # --- CRITICAL CLOUD FIX ---
-            # Cloud Servers (Streamlit/Heroku) DO NOT allow root access.
-            # We MUST use -sT (Connect Scan) instead of -sS (SYN Scan).
-            # We must remove -O (OS Detection) as it requires root.
-            
-            if mode == "fast":
-                # Fast: Top 100 ports, no version detection
-                scan_args = "-sT -F"
-            elif mode == "deep":
-                # Deep: All ports with version detection and vulnerability scripts
-                scan_args = "-sT -sV --version-intensity 5 --script vuln"
-            elif mode == "pen_test":
-                # Pen Testing: Version detection with extended probing, all ports (Windows-compatible)
-                # Note: Limiting to -sV with high intensity to avoid NSE compatibility issues on Windows
-                scan_args = "-sT -sV --version-intensity 9 -p-"
-            else:
-                # Fallback for unknown modes
-                scan_args = "-sT -F"
-            
-            logging.info(f"Executing: nmap {scan_args} {target}")
+            if mode == "pen_test":
+                # Pen Testing: all ports, version detection only where something is listening
+                return self._run_pen_test(target)
             
-            # Run the scan
-            self.scanner.scan(hosts=target, arguments=scan_args)
-            
-            return self._structure_data_for_ai(target, mode)
+            return self._run_nmap(self._scan_args(mode), target, mode)
             
         except Exception as e:
-            logging.error(f"Scan failed: {e}")
+            logging.error("Scan failed: %s", e)
             return {"error": f"Scan failed: {str(e)}"}
 
-    def _structure_data_for_ai(self, target, mode="fast"):
+    def iter_hosts(self, target, mode="fast"):
+        """
+        Generator variant of run_scan: yields each host dict as soon as Nmap
+        finishes that host, instead of after the whole scan.
+        pen_test is two-phase, so its hosts are yielded once the version pass completes.
+        
+        Raises on failure (unlike run_scan, which returns an error dict).
+        """
+        _resolve(target)
+        logging.info("Starting %s scan on target: %s...", mode, target)
+        
+        if mode == "pen_test":
+            yield from self._run_pen_test(target)["hosts"]
+            return
+        
+        for kind, data in self._stream_nmap(self._scan_args(mode), target):
+            if kind == "host":
+                yield data
+
+    @staticmethod
+    def _scan_args(mode):
+        """Nmap arguments for the single-pass modes."""
+        # --- CRITICAL CLOUD FIX ---
+        # Cloud Servers (Streamlit/Heroku) DO NOT allow root access.
+        # We MUST use -sT (Connect Scan) instead of -sS (SYN Scan).
+        # We must remove -O (OS Detection) as it requires root.
+        
+        if mode == "fast":
+            # Fast: Top 100 ports, no version detection
+            return "-sT -F"
+        if mode == "deep":
+            # Deep: All ports with version detection and vulnerability scripts
+            return "-sT -sV --version-intensity 5 --script vuln --min-rate 500"
+        # Fallback for unknown modes
+        return "-sT -F"
+
+    def _run_pen_test(self, target):
+        """
+        Two-phase pen_test scan.
+        Phase 1 sweeps all 65k ports without service probes; phase 2 runs -sV only
+        on the ports found open, so version probing is O(open ports), not O(65k).
+        """
+        # Phase 1: port discovery (rate floor + capped retries for the -p- sweep)
+        discovery = self._run_nmap("-sT -p- --min-rate 1000 --max-retries 2", target, "pen_test")
+        
+        open_ports = sorted({
+            port["port"]
+            for host in discovery["hosts"]
+            for port in host["open_ports"]
+            if port["state"] == "open"
+        })
+        if not open_ports:
+            return discovery
+        
+        # Phase 2: version detection with extended probing (Windows-compatible)
+        # Note: Limiting to -sV (no NSE) to avoid NSE compatibility issues on Windows
+        port_list = ",".join(str(port) for port in open_ports)
+        versions = self._run_nmap(f"-sT -sV --version-intensity 7 -p {port_list}", target, "pen_test")
+        
+        # Overlay phase 2 port details onto the phase 1 results
+        detailed = {
+            (host["ip"], port["protocol"], port["port"]): port
+            for host in versions["hosts"]
+            for port in host["open_ports"]
+        }
+        for host in discovery["hosts"]:
+            host["open_ports"] = [
+                detailed.get((host["ip"], port["protocol"], port["port"]), port)
+                for port in host["open_ports"]
+            ]
+        
+        try:
+            elapsed = float(discovery["scan_stats"]["elapsed"]) + float(versions["scan_stats"]["elapsed"])
+            discovery["scan_stats"]["elapsed"] = f"{elapsed:.2f}"
+        except (KeyError, ValueError):
+            pass
+        
+        return discovery
+
+    def _run_nmap(self, scan_args, target, mode):
+        """Runs one nmap invocation and returns the structured result (raises on failure)."""
+        return self._structure_data_for_ai(self._stream_nmap(scan_args, target), target, mode)
+
+    def _stream_nmap(self, scan_args, target):
+        """
+        Runs nmap and yields ("host", host_info) / ("runstats", scan_stats) events
+        while the scan is still running. Raises once the process fails.
+        """
+        logging.info("Executing: nmap %s %s", scan_args, target)
+        
+        # Parse the XML report as nmap writes it to stdout; --stats-every adds
+        # <taskprogress> elements that are logged as they arrive.
+        # stderr goes to a temp file so a chatty nmap can't fill the pipe and stall.
+        cmd = [self.nmap_path, "-oX", "-", "--stats-every", "5s"] + scan_args.split() + [target]
+        with tempfile.TemporaryFile() as stderr_file:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file)
+            parsed = False
+            try:
+                # read1 returns whatever is already in the pipe; plain read(n) would
+                # block until n bytes arrive, holding back hosts nmap has finished
+                yield from self._iter_xml_events(types.SimpleNamespace(read=proc.stdout.read1))
+                parsed = True
+            except ET.ParseError:
+                pass
+            finally:
+                proc.stdout.close()
+                if not parsed and proc.poll() is None:
+                    # Consumer stopped early (or output was garbage): don't leave nmap running
+                    proc.terminate()
+                returncode = proc.wait()
+            
+            if returncode != 0 or not parsed:
+                stderr_file.seek(0)
+                stderr = stderr_file.read().decode(errors="replace").strip()
+                raise Exception(stderr or f"nmap exited with code {returncode}")
+
+    def _iter_xml_events(self, xml_stream):
         """
-        Cleans the raw Nmap output into a clean JSON format.
+        Incrementally parses Nmap XML (a binary file-like object).
+        Each <host> element is converted and then cleared, so only one host's
+        XML tree is held in memory at a time.
+        """
+        for _, elem in ET.iterparse(xml_stream, events=("end",)):
+            if elem.tag == "host":
+                yield "host", self._parse_host(elem)
+                elem.clear()
+            elif elem.tag == "runstats":
+                yield "runstats", self._parse_runstats(elem)
+            elif elem.tag == "taskprogress":
+                logging.info("Nmap progress: %s %s%% done", elem.get("task"), elem.get("percent"))
+
+    def _structure_data_for_ai(self, events, target, mode="fast"):
+        """
+        Cleans the parsed Nmap events into a clean JSON format.
         """
         clean_data = {
             "target": target,
             "scan_mode": mode,
-            "scan_stats": self.scanner.scanstats(),
+            "scan_stats": {},
             "hosts": []
         }
 
-        for host in self.scanner.all_hosts():
-            host_info = {
-                "ip": host,
-                "status": self.scanner[host].state(),
-                "hostnames": self.scanner[host].hostname(),
-                "open_ports": []
-            }
-
-            for proto in self.scanner[host].all_protocols():
-                ports = self.scanner[host][proto].keys()
-                for port in sorted(ports):
-                    port_data = self.scanner[host][proto][port]
-                    
-                    # Extract script output safely
-                    vuln_output = ""
-                    if 'script' in port_data:
-                        vuln_output = port_data['script']
-
-                    host_info["open_ports"].append({
-                        "port": port,
-                        "protocol": proto,
-                        "state": port_data['state'],
-                        "service": port_data['name'],
-                        "product": port_data.get('product', 'unknown'),
-                        "version": port_data.get('version', 'unknown'),
-                        "vulnerabilities_found": vuln_output
-                    })
-            
-            clean_data["hosts"].append(host_info)
+        for kind, data in events:
+            if kind == "host":
+                clean_data["hosts"].append(data)
+            elif kind == "runstats":
+                clean_data["scan_stats"] = data
+
+        return clean_data
+
+    @staticmethod
+    def _parse_runstats(elem):
+        """Scan statistics, matching the keys of python-nmap's scanstats()."""
+        finished = elem.find("finished")
+        hosts = elem.find("hosts")
+        finished = finished.attrib if finished is not None else {}
+        hosts = hosts.attrib if hosts is not None else {}
+        return {
+            "timestr": finished.get("timestr", ""),
+            "elapsed": finished.get("elapsed", ""),
+            "uphosts": hosts.get("up", ""),
+            "downhosts": hosts.get("down", ""),
+            "totalhosts": hosts.get("total", "")
+        }
+
+    @staticmethod
+    def _parse_host(elem):
+        """Converts one <host> element into the host_info dict."""
+        ip = ""
+        for address in elem.iter("address"):
+            if address.get("addrtype") in ("ipv4", "ipv6"):
+                ip = address.get("addr", "")
+                break
+
+        status = elem.find("status")
+
+        # Prefer the user-supplied hostname, otherwise the first one reported
+        hostname = ""
+        names = elem.findall("hostnames/hostname")
+        for name in names:
+            if name.get("type") == "user":
+                hostname = name.get("name", "")
+                break
+        else:
+            if names:
+                hostname = names[0].get("name", "")
+
+        # Pre-bound for the per-port loop (-p- scans can report thousands of ports)
+        open_ports = []
+        append = open_ports.append
+        for port in elem.iterfind("ports/port"):
+            state = port.find("state")
+            service = port.find("service")
+            service = service.attrib if service is not None else {}
+
+            # Script (vuln) output as "id: output" lines
+            vuln_output = "\n".join(
+                f"{script.get('id', '')}: {script.get('output', '')}"
+                for script in port.iterfind("script")
+            )
+
+            append({
+                "port": int(port.get("portid")),
+                "protocol": port.get("protocol"),
+                "state": state.get("state") if state is not None else "unknown",
+                "service": service.get("name", ""),
+                "product": service.get("product", ""),
+                "version": service.get("version", ""),
+                "vulnerabilities_found": vuln_output
+            })
+
+        # Same ordering python-nmap produced: by protocol, then port number
+        open_ports.sort(key=_PORT_SORT_KEY)
+
+        return {
+            "ip": ip,
+            "status": status.get("state") if status is not None else "unknown",
+            "hostnames": hostname,
+            "open_ports": open_ports
+        }
 
-        return clean_data
\ No newline at end of file
+@functools.lru_cache(maxsize=1)
+def get_nmap_scanner():
+    """Process-wide NmapScanner, so repeated imports don't redo the binary lookup."""
+    return NmapScanner()
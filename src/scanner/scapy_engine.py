@@ -1,6 +1,7 @@
 # Logic for Scapy Packet Manipulation
 import logging
-from scapy.all import IP, TCP, ICMP, sr1, conf
+import functools
+from scapy.all import IP, TCP, ICMP, sr, conf
 
 # Suppress Scapy verbose output
 conf.verb = 0
@@ -15,46 +16,73 @@ class ScapyEngine:
         - If we get an RST (Reset) response, the firewall is likely 'Stateless' or non-existent (Unfiltered).
         - If we get NO response (Timeout), the firewall is 'Stateful' (Filtered/Dropping packets).
         """
-        logging.info(f"Probing firewall on {target_ip}:{port}...")
+        results = self.firewall_detect_ports(target_ip, [port])
+        if "error" in results:
+            return results
+        return results[port]
+
+    def firewall_detect_ports(self, target_ip, ports):
+        """
+        Batched firewall_detect: probes every port in one send/receive round,
+        so N ports cost a single timeout instead of N.
+        
+        Returns:
+            dict mapping port -> firewall_detect-style result, or {"error": ...}
+        """
+        logging.info(f"Probing firewall on {target_ip} ports {list(ports)}...")
         
         try:
-            # Craft a raw TCP ACK packet (simulating an established connection)
-            # A stateful firewall should DROP this because it didn't see a SYN first.
-            pkt = IP(dst=target_ip)/TCP(dport=port, flags="A")
+            # Craft raw TCP ACK packets (simulating an established connection)
+            # A stateful firewall should DROP these because it didn't see a SYN first.
+            # Scapy expands the dport list into one packet per port.
+            pkts = IP(dst=target_ip)/TCP(dport=list(ports), flags="A")
             
-            # Send and wait 2 seconds for response
-            response = sr1(pkt, timeout=2, verbose=False)
-
-            result = {
-                "target": target_ip,
-                "port": port,
-                "response_type": "None",
-                "firewall_status": "Unknown",
-                "explanation": ""
-            }
-
-            if response is None:
-                result["response_type"] = "Timeout"
-                result["firewall_status"] = "Stateful / Filtered (Secure)"
-                result["explanation"] = "The target dropped our unsolicited ACK packet. This indicates a Stateful Firewall is active."
-            elif response.haslayer(TCP):
-                if response[TCP].flags == 0x04: # RST flag
-                    result["response_type"] = "RST Packet"
-                    result["firewall_status"] = "Stateless / Unfiltered (Less Secure)"
-                    result["explanation"] = "The target replied with a Reset (RST). It does not track connection states, allowing us to map its rules."
-                else:
-                    result["response_type"] = f"Flags: {response[TCP].flags}"
-                    result["firewall_status"] = "Unknown Behavior"
-            elif response.haslayer(ICMP):
-                result["response_type"] = "ICMP Error"
-                result["firewall_status"] = "Blocked by Admin"
+            # Send all and wait up to 2 seconds for responses. sr() returns as soon as
+            # every probe is answered, so the timeout only costs time for ports that stay
+            # silent (the filtered case) - replies arriving in milliseconds return immediately.
+            answered, _ = sr(pkts, timeout=2, verbose=False)
+            responses = {sent[TCP].dport: received for sent, received in answered}
             
-            return result
+            return {port: self._classify_response(target_ip, port, responses.get(port)) for port in ports}
 
         except Exception as e:
             logging.error(f"Scapy scan failed: {e}")
             return {"error": str(e)}
 
+    @staticmethod
+    def _classify_response(target_ip, port, response):
+        """Maps the reply (or lack of one) to an ACK probe onto a firewall verdict."""
+        result = {
+            "target": target_ip,
+            "port": port,
+            "response_type": "None",
+            "firewall_status": "Unknown",
+            "explanation": ""
+        }
+
+        if response is None:
+            result["response_type"] = "Timeout"
+            result["firewall_status"] = "Stateful / Filtered (Secure)"
+            result["explanation"] = "The target dropped our unsolicited ACK packet. This indicates a Stateful Firewall is active."
+        elif response.haslayer(TCP):
+            if response[TCP].flags == 0x04: # RST flag
+                result["response_type"] = "RST Packet"
+                result["firewall_status"] = "Stateless / Unfiltered (Less Secure)"
+                result["explanation"] = "The target replied with a Reset (RST). It does not track connection states, allowing us to map its rules."
+            else:
+                result["response_type"] = f"Flags: {response[TCP].flags}"
+                result["firewall_status"] = "Unknown Behavior"
+        elif response.haslayer(ICMP):
+            result["response_type"] = "ICMP Error"
+            result["firewall_status"] = "Blocked by Admin"
+        
+        return result
+
+@functools.lru_cache(maxsize=1)
+def get_scapy_engine():
+    """Process-wide ScapyEngine."""
+    return ScapyEngine()
+
 # --- TEST BLOCK ---
 if __name__ == "__main__":
     # Windows Users: You might need to install Npcap for Scapy to work!
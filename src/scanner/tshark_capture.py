@@ -7,8 +7,7 @@ import time
 class TSharkCapture:
     def __init__(self, output_dir="logs/captures"):
         self.output_dir = output_dir
-        if not os.path.exists(self.output_dir):
-            os.makedirs(self.output_dir)
+        os.makedirs(self.output_dir, exist_ok=True)
 
     def capture_traffic(self, interface="eth0", duration=10, target_ip=None):
         """
@@ -1,8 +1,11 @@
 import subprocess
 import os
 import logging
+import functools
 import time
 import re
+import threading
+from collections import Counter
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -16,11 +19,15 @@ class TSharkScanner:
     - Strips PII from output before returning
     """
     
+    # Strict IPv4 validation for BPF filters (compiled once)
+    _IPV4_RE = re.compile(r"^(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$")
+    
+    # Seconds allowed for reading a capture back with tshark -r
+    PARSE_TIMEOUT = 10
+    
     def __init__(self, output_dir="logs/captures"):
         self.output_dir = output_dir
-        if not os.path.exists(self.output_dir):
-            os.makedirs(self.output_dir)
-            logging.info(f"Created capture directory: {self.output_dir}")
+        os.makedirs(self.output_dir, exist_ok=True)
     
     def run_capture(self, target_ip, duration=10, interface="eth0"):
         """
@@ -118,6 +125,15 @@ class TSharkScanner:
         Returns: dict with protocol counts and types (NO raw data)
         """
         try:
+            # A pcap with nothing past its 24-byte global header holds no packets:
+            # skip spawning tshark for it
+            if os.path.getsize(pcap_filepath) <= 24:
+                return {
+                    "protocols_detected": {},
+                    "total_packets": 0,
+                    "unique_protocols": []
+                }
+            
             # Use tshark to read the PCAP and extract protocol info
             cmd = [
                 "tshark",
@@ -127,25 +143,44 @@ class TSharkScanner:
                 "-E", "separator=,"
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+            # Stream stdout through a 128 KB buffer and count lines as they
+            # arrive instead of holding the whole dump in memory
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                    bufsize=131072)
+            timed_out = threading.Event()
             
-            if result.returncode != 0:
+            def _kill():
+                timed_out.set()
+                proc.kill()
+            
+            watchdog = threading.Timer(self.PARSE_TIMEOUT, _kill)
+            watchdog.start()
+            try:
+                with proc.stdout:
+                    # Tally raw lines first: Counter and bytes.strip both run in C,
+                    # and only the handful of distinct lines is decoded below
+                    lines = Counter(map(bytes.strip, proc.stdout))
+                returncode = proc.wait()
+            finally:
+                watchdog.cancel()
+            
+            if timed_out.is_set():
+                raise subprocess.TimeoutExpired(cmd, self.PARSE_TIMEOUT)
+            
+            if returncode != 0:
                 logging.warning("Failed to parse PCAP")
                 return {}
             
             # Count protocols
-            protocols = {}
-            for line in result.stdout.strip().split('\n'):
-                if not line:
-                    continue
-                proto_list = line.split(',')
-                for proto in proto_list:
+            protocols = Counter()
+            for line, count in lines.items():
+                for proto in line.decode(errors="replace").split(','):
                     proto = proto.strip()
                     if proto:
-                        protocols[proto] = protocols.get(proto, 0) + 1
+                        protocols[proto] += count
             
             return {
-                "protocols_detected": protocols,
+                "protocols_detected": dict(protocols),
                 "total_packets": sum(protocols.values()),
                 "unique_protocols": list(protocols.keys())
             }
@@ -160,6 +195,9 @@ class TSharkScanner:
         Validate IP address for safe use in BPF filter.
         Prevents filter injection attacks.
         """
-        # Strict IPv4 validation
-        ipv4_regex = r"^(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$"
-        return bool(re.match(ipv4_regex, ip))
+        return bool(TSharkScanner._IPV4_RE.match(ip))
+
+@functools.lru_cache(maxsize=1)
+def get_tshark_scanner():
+    """Process-wide TSharkScanner, so the capture directory check runs once."""
+    return TSharkScanner()
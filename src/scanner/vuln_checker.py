@@ -1,6 +1,9 @@
 # Logic for Vulnerability parsing
 import re
 
+# Regex to find CVE-YYYY-NNNN patterns
+cve_pattern = re.compile(r"CVE-\d{4}-\d{4,7}")
+
 class VulnChecker:
     @staticmethod
     def extract_cves(nmap_data):
@@ -9,9 +12,6 @@ class VulnChecker:
         Returns a simplified list of vulnerabilities found.
         """
         vulnerabilities = []
-        
-        # Regex to find CVE-YYYY-NNNN patterns
-        cve_pattern = re.compile(r"CVE-\d{4}-\d{4,7}")
 
         if "hosts" not in nmap_data:
             return []
@@ -21,14 +21,14 @@ class VulnChecker:
                 script_output = port.get("vulnerabilities_found", "")
                 
                 if script_output:
-                    # Find specific CVEs
-                    cves = cve_pattern.findall(script_output)
+                    # Find specific CVEs (deduplicated, first-seen order)
+                    cves = dict.fromkeys(cve_pattern.findall(script_output))
                     
                     vulnerabilities.append({
                         "port": port["port"],
                         "service": port["service"],
                         "raw_output": script_output[:200], # Truncate for brevity
-                        "cves_detected": list(set(cves)) # Unique CVEs
+                        "cves_detected": list(cves) # Unique CVEs
                     })
         
         return vulnerabilities
\ No newline at end of file
@@ -1,10 +1,37 @@
 # Privacy-by-design data sanitization
 import re
-import copy
+from collections import deque
 import logging
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# --- REGEX PATTERNS (Strict) ---
+# One alternation instead of five separate passes: each string is scanned once.
+# At a given position the alternatives are tried in the old pass order
+# (MAC, email, password, credential, IPv4).
+SANITIZE_REGEX = re.compile(
+    r"(?P<mac>(?:[0-9A-Fa-f]{2}[:-]){5}[0-9A-Fa-f]{2})"
+    r"|(?P<email>\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b)"
+    r"|(?P<password>(?i:password|passwd|pwd)[:\s=]+[^\s,}]+)"
+    r"|(?P<credential>(?i:username|user|login)[:\s=]+[^\s,}]+)"
+    # IPv4 pattern for internal masking
+    r"|(?P<ip>\b(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\b)"
+)
+# Cheap necessary condition for any SANITIZE_REGEX match (digit for IPs, ':'/'-'
+# for MACs, '@' for emails, or a password/credential keyword); strings without
+# one are returned untouched without running the full alternation.
+SANITIZE_GATE = re.compile(r"[\d:@-]|(?i:passw|pwd|user|login)")
+# Fixed replacement per match group (IPs are masked, not replaced)
+REDACTIONS = {
+    "mac": "[REDACTED_MAC]",
+    "email": "[REDACTED_EMAIL]",
+    "password": "[REDACTED_PASSWORD]",
+    "credential": "[REDACTED_CREDENTIAL]"
+}
+# Private IP ranges (10/8, 172.16/12, 192.168/16, 127/8). Only applied to
+# addresses already matched by SANITIZE_REGEX, so checking the prefix suffices.
+private_ip_prefix = re.compile(r"(?:10|127)\.|172\.(?:1[6-9]|2[0-9]|3[01])\.|192\.168\.")
+
 def sanitize_scan_data(scan_data, target=None):
     """
     Privacy-by-design sanitization function.
@@ -24,30 +51,9 @@ def sanitize_scan_data(scan_data, target=None):
     Returns:
         Deeply sanitized copy of scan_data
     """
-    # Deep copy to avoid modifying original
-    sanitized = copy.deepcopy(scan_data)
-    
-    # --- REGEX PATTERNS (Strict) ---
-    mac_regex = re.compile(r"([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})", re.IGNORECASE)
-    email_regex = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b")
-    password_regex = re.compile(r"(?i)(password|passwd|pwd)[:\s=]+[^\s,}]+", re.IGNORECASE)
-    credential_regex = re.compile(r"(?i)(username|user|login)[:\s=]+[^\s,}]+", re.IGNORECASE)
-    # IPv4 pattern for internal masking
-    ipv4_regex = re.compile(r"\b(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\b")
-    # Private IP ranges
-    private_ip_patterns = [
-        re.compile(r"^10\.\d+\.\d+\.\d+$"),
-        re.compile(r"^172\.(1[6-9]|2[0-9]|3[01])\.\d+\.\d+$"),
-        re.compile(r"^192\.168\.\d+\.\d+$"),
-        re.compile(r"^127\.\d+\.\d+\.\d+$")
-    ]
-    
     def _is_private_ip(ip):
         """Check if IP is in private range."""
-        for pattern in private_ip_patterns:
-            if pattern.match(ip):
-                return True
-        return False
+        return private_ip_prefix.match(ip) is not None
     
     def _mask_ip(ip):
         """Mask private IP addresses intelligently."""
@@ -56,48 +62,46 @@ def sanitize_scan_data(scan_data, target=None):
             return f"{parts[0]}.{parts[1]}.{parts[2]}.XXX"
         return ip
     
-    def recursive_clean(obj):
-        """Recursively sanitize dict/list structures."""
-        if isinstance(obj, dict):
-            for k, v in obj.items():
-                if isinstance(v, str):
-                    # Apply sanitization rules
-                    sanitized_val = v
-                    
-                    # Rule 1: Strip MAC addresses
-                    sanitized_val = mac_regex.sub("[REDACTED_MAC]", sanitized_val)
-                    
-                    # Rule 2: Strip email addresses
-                    sanitized_val = email_regex.sub("[REDACTED_EMAIL]", sanitized_val)
-                    
-                    # Rule 3: Strip password patterns
-                    sanitized_val = password_regex.sub("[REDACTED_PASSWORD]", sanitized_val)
-                    
-                    # Rule 4: Strip username/login patterns
-                    sanitized_val = credential_regex.sub("[REDACTED_CREDENTIAL]", sanitized_val)
-                    
-                    # Rule 5: Mask internal IP addresses
-                    # But preserve the target IP (already known)
-                    def mask_ip_func(match):
-                        ip = match.group(0)
-                        # Don't mask the original target IP
-                        if target and (target == ip or target in ip):
-                            return ip
-                        return _mask_ip(ip)
-                    
-                    sanitized_val = ipv4_regex.sub(mask_ip_func, sanitized_val)
-                    
-                    obj[k] = sanitized_val
-                
-                elif isinstance(v, (dict, list)):
-                    recursive_clean(v)
-        
-        elif isinstance(obj, list):
-            for item in obj:
-                recursive_clean(item)
+    def replace_match(match):
+        """Redacts a sensitive match; masks IPs unless it is the scan target."""
+        kind = match.lastgroup
+        if kind != "ip":
+            return REDACTIONS[kind]
+        ip = match.group(0)
+        # Don't mask the original target IP
+        if target and (target == ip or target in ip):
+            return ip
+        return _mask_ip(ip)
+    
+    def clean_value(v, pending):
+        """Sanitize a string, or return an empty container queued for filling."""
+        if isinstance(v, str):
+            if not SANITIZE_GATE.search(v):
+                return v
+            # Apply all sanitization rules in a single pass
+            return SANITIZE_REGEX.sub(replace_match, v)
+        if isinstance(v, dict):
+            child = {}
+        elif isinstance(v, list):
+            child = []
+        else:
+            return v
+        pending.append((v, child))
+        return child
     
-    # Apply recursive sanitization
-    recursive_clean(sanitized)
+    # Build the sanitized copy with an explicit worklist rather than recursion,
+    # so deeply nested scan output cannot hit the interpreter recursion limit
+    stack = deque()
+    sanitized = clean_value(scan_data, stack)
+    while stack:
+        src, dst = stack.pop()
+        if isinstance(src, dict):
+            for k, v in src.items():
+                dst[k] = clean_value(v, stack)
+        else:
+            for item in src:
+                # Bare strings in lists are kept as-is (only dict values are scrubbed)
+                dst.append(item if isinstance(item, str) else clean_value(item, stack))
     
     logging.info("Data sanitization complete (PII removed)")
     return sanitized
@@ -4,18 +4,29 @@ import socket
 
 def is_valid_ip(ip_str):
     """Checks if the string is a valid IPv4 address."""
+    # Cheap C-level prefilter: hostnames never reach inet_pton (and its
+    # exception path). strip() leaves something behind iff a non-digit/dot exists.
+    if ip_str.count(".") != 3 or ip_str.strip("0123456789."):
+        return False
     try:
         socket.inet_pton(socket.AF_INET, ip_str)
         return True
     except socket.error:
         return False
 
+# Whole hostname in one match: dot-separated labels of 1-63 chars,
+# no leading/trailing hyphen, optional trailing root dot
+_HOSTNAME_RE = re.compile(
+    r"(?!-)[A-Z\d-]{1,63}(?<!-)(?:\.(?!-)[A-Z\d-]{1,63}(?<!-))*\.?",
+    re.IGNORECASE
+)
+
 def is_valid_hostname(hostname):
     """Simple hostname check."""
     if len(hostname) > 255: return False
-    if hostname[-1] == ".": hostname = hostname[:-1]
-    allowed = re.compile(r"(?!-)[A-Z\d-]{1,63}(?<!-)$", re.IGNORECASE)
-    return all(allowed.match(x) for x in hostname.split("."))
+    return _HOSTNAME_RE.fullmatch(hostname) is not None
 
 def validate_target(target):
-    return is_valid_ip(target) or is_valid_hostname(target)
\ No newline at end of file
+    # ':' only appears in IPv6/host:port strings, which neither check accepts
+    if ":" in target: return False
+    return is_valid_ip(target) or is_valid_hostname(target)